@@ -1,14 +1,96 @@
 import collections
+import hashlib
+import json
+import mmap
 import os
+import sqlite3
 import subprocess
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date
 from enum import Enum
+from functools import lru_cache
 from pathlib import Path
+from typing import Callable, Iterable, Iterator
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import yaml
 
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:  # PyYAML built without LibYAML
+    from yaml import SafeLoader as YamlLoader
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional, without it the counters scan bytes in Python
+    njit = None
+
+# File reads and the numba kernel release the GIL, so oversubscribing threads keeps the disk busy
+IO_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+READ_CHUNK_SIZE = 1 << 20
+# Above this size, counting newlines on a memory-mapped numpy view beats chunked reads
+MMAP_MIN_SIZE = 1 << 16
+
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "repo-insights"
+# Bump whenever the schema or what the counters return changes, so older cache databases are reset
+CACHE_VERSION = 1
+CACHE_SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS files (
+        method TEXT, path BLOB, mtime INTEGER, size INTEGER, complexity INTEGER,
+        PRIMARY KEY (method, path)
+    );
+    CREATE TABLE IF NOT EXISTS changes (key TEXT PRIMARY KEY, head TEXT, counts TEXT);
+    PRAGMA user_version = {CACHE_VERSION};
+"""
+CACHE_RESET = """
+    DROP TABLE IF EXISTS files;
+    DROP TABLE IF EXISTS changes;
+"""
+# The cache is best-effort: an unwritable cache dir or a locked database falls back to counting without it
+CACHE_ERRORS = (OSError, sqlite3.Error)
+
+
+@lru_cache(maxsize=None)
+def _load_config(config_path: str) -> dict:
+    with open(config_path) as f:
+        config = yaml.load(f, Loader=YamlLoader)
+    config["exclude_dirs"] = frozenset(config["exclude_dirs"])
+    config["exclude_files"] = frozenset(config["exclude_files"])
+    config["include_extensions"] = frozenset(ext.lower() for ext in config.get("include_extensions") or [])
+    return config
+
+
+def _count_left_white_spaces_kernel(buffer: np.ndarray) -> int:
+    # Byte-level equivalent of the bytes.splitlines()/lstrip() scan in
+    # Hotspots._count_file_left_white_spaces, meant to be compiled by numba
+    size = len(buffer)
+    total_white_spaces = 0
+    i = 0
+    while i < size:
+        white_spaces = 0
+        while i < size and (buffer[i] == 0x20 or buffer[i] == 0x09 or buffer[i] == 0x0B or buffer[i] == 0x0C):
+            white_spaces += 1
+            i += 1
+        if i < size and buffer[i] != 0x0A and buffer[i] != 0x0D:
+            first = buffer[i]
+            second = buffer[i + 1] if i + 1 < size else 0
+            is_comment = first == 0x23 or first == 0x2A or (first == 0x2F and (second == 0x2F or second == 0x2A))
+            if not is_comment:
+                total_white_spaces += white_spaces
+        while i < size and buffer[i] != 0x0A and buffer[i] != 0x0D:
+            i += 1
+        if i + 1 < size and buffer[i] == 0x0D and buffer[i + 1] == 0x0A:
+            i += 1
+        i += 1
+    return total_white_spaces
+
+
+if njit is not None:
+    _count_left_white_spaces_kernel = njit(cache=True, nogil=True)(_count_left_white_spaces_kernel)
+
 
 class ComplexityMode(Enum):
     NUMBER_OF_LINES = "Number of lines"
@@ -26,76 +108,96 @@ class Hotspots:
                  complexity_method: ComplexityMode = ComplexityMode.NUMBER_OF_LINES,
                  changes_method: ChangesMode = ChangesMode.NUMBER_OF_COMMITS,
                  months_back: int = -1,
-                 depth_level: int = -1):
+                 depth_level: int = -1,
+                 use_cache: bool = True):
 
-        self.analyze_path = analyze_path
+        self.analyze_path = str(Path(analyze_path).resolve())
         self.repo_path = self.find_repo_path()
+        # Stripping this prefix turns an absolute file path into its path relative to the repo
+        self._repo_prefix = self.repo_path.rstrip(os.sep) + os.sep
         self.complexity_method = complexity_method
         self.changes_method = changes_method
         self.months_back = months_back
+        self._since_arg = f'--since={months_back}.months.ago' if months_back != -1 else None
         self.depth_level = depth_level
+        self.use_cache = use_cache
 
         self.config = self.read_config()
+        self._exclude_dirs = self.config["exclude_dirs"]
+        self._exclude_files = self.config["exclude_files"]
+        self._include_extensions = self.config["include_extensions"]
         self.data = pd.DataFrame()
 
-    def find_repo_path(self) -> str | None:
-        original_cwd = os.getcwd()
-        os.chdir(self.analyze_path)
-        while True:
-            if ".git" in os.listdir():
-                repo_path = os.getcwd()
-                os.chdir(original_cwd)
-                return repo_path
-            elif os.getcwd() == "/":
-                raise SystemError("The provided path does not correspond to a git repository")
-            os.chdir("..")
+    def find_repo_path(self) -> str:
+        analyze_path = Path(self.analyze_path)
+        for path in [analyze_path, *analyze_path.parents]:
+            if (path / ".git").exists():
+                return str(path)
+        raise SystemError("The provided path does not correspond to a git repository")
 
     @staticmethod
     def read_config(config_path: str = "config/hotspots.yaml") -> dict:
-        with open(Path(config_path)) as f:
-            config = yaml.safe_load(f)
-        return config
+        # Copy so callers can't modify the cached config, its values are already immutable
+        return dict(_load_config(str(Path(config_path).resolve())))
 
     def get_files(self) -> None:
+        self._set_file_paths(list(self._iter_files(self.analyze_path)))
+
+    def scan(self) -> None:
+        # get_files and get_complexity in a single pass: each file goes to the thread pool as soon as the walk
+        # finds it, so reading files overlaps with listing the remaining directories
         file_paths = []
-        analyze_path_parts = len(Path(self.analyze_path).parts)
-        for root, dirs, files in os.walk(self.analyze_path):
-            dirs[:] = [d for d in dirs if d not in self.config["exclude_dirs"]]
-
-            for file in files:
-                if file in self.config["exclude_files"]:
-                    continue
-                file_path = Path(root) / file
+
+        def walk() -> Iterator[str]:
+            for file_path in self._iter_files(self.analyze_path):
                 file_paths.append(file_path)
-        self.data = pd.DataFrame(file_paths, columns=["file_path"])
+                yield file_path
+
+        complexity = self._get_complexity(walk())
+        self._set_file_paths(file_paths, complexity=complexity)
+
+    def _set_file_paths(self, file_paths: list, **columns) -> None:
+        # Build the whole frame at once instead of inserting its columns one by one
+        file_paths = pd.Series(pd.array(file_paths, dtype="string"))
+        self.data = pd.DataFrame({
+            "file_path": file_paths,
+            "rel_path": file_paths.str.removeprefix(self._repo_prefix),
+            **columns
+        })
+
+    def _iter_files(self, root: str) -> Iterator[str]:
+        directories = [root]
+        while directories:
+            try:
+                entries = os.scandir(directories.pop())
+            except OSError:  # Skip unreadable directories, as os.walk does
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in self._exclude_dirs:
+                            directories.append(entry.path)
+                    elif entry.is_file() and entry.name not in self._exclude_files:
+                        yield entry.path
+
+    def _is_included(self, file_path: str) -> bool:
+        extension = os.path.splitext(file_path)[1].lower()
+        return not self._include_extensions or extension in self._include_extensions
 
     def wrangle_data_by_depth_level(self) -> pd.DataFrame:
         if self.depth_level < 0:
             return self.data
 
-        # Normalize analyze_path
-        analyze_path = Path(self.analyze_path).resolve()
-
-        # Function to determine the aggregation level for a given path
-        def aggregation_level(path):
-            path = Path(path).resolve()
-            relative_path = path.relative_to(analyze_path)
-            if len(relative_path.parts) > self.depth_level:
-                # If the file is deeper than the specified depth level, return the directory up to the depth level with a slash
-                dir_path = Path(analyze_path, *relative_path.parts[:self.depth_level])
-                return f"{str(dir_path)}/"  # Append slash to indicate directory
-            elif len(relative_path.parts) == self.depth_level:
-                # If the file is at the exact depth level, check if it is a directory and append a slash if it is
-                if path.is_dir():
-                    return f"{str(path)}/"  # Append slash to indicate directory
-                else:
-                    return str(path)  # Return file path as is
-            else:
-                # Otherwise, it's out of our depth scope
-                return None
+        # analyze_path is already resolved and every file_path lives under it
+        analyze_prefix = self.analyze_path.rstrip(os.sep) + os.sep
+        relative_parts = self.data['file_path'].str.removeprefix(analyze_prefix).str.split(os.sep)
+        depths = relative_parts.str.len()
 
-        # Apply the aggregation_level function to each file path
-        self.data['aggregation_level'] = self.data['file_path'].apply(aggregation_level)
+        # Files deeper than the specified depth level go to their directory up to the depth level, with a slash
+        # to indicate directory. Files at the exact depth level are kept as is, shallower ones are out of our depth scope
+        dir_paths = (analyze_prefix + relative_parts.str[:self.depth_level].str.join(os.sep)).str.rstrip(os.sep) + "/"
+        file_paths = self.data['file_path'].where(depths == self.depth_level)
+        self.data['aggregation_level'] = dir_paths.where(depths > self.depth_level, file_paths)
 
         # Remove rows that are out of our depth scope
         self.data = self.data[self.data['aggregation_level'].notnull()]
@@ -109,11 +211,31 @@ class Hotspots:
         return df_grouped
 
     def get_complexity(self) -> None:
+        self.data["complexity"] = self._get_complexity(self.data['file_path'].tolist())
+
+    def _get_complexity(self, file_paths: Iterable[str]) -> np.ndarray:
+        # Files without an included extension stay in the results, but they are never read and their complexity is 0
+        included, total = [], 0
+
+        def included_file_paths() -> Iterator[str]:
+            nonlocal total
+            for index, file_path in enumerate(file_paths):
+                total = index + 1
+                if self._is_included(file_path):
+                    included.append(index)
+                    yield file_path
+
+        counts = self._get_cached_complexity(self._get_complexity_counter(), included_file_paths())
+        complexity = np.zeros(total, dtype="int64")
+        complexity[included] = counts
+        return complexity
+
+    def _get_complexity_counter(self) -> Callable[[str], int]:
         match self.complexity_method:
             case ComplexityMode.NUMBER_OF_LINES:
-                self._get_number_of_lines()
+                return self._count_file_lines
             case ComplexityMode.LEFT_WHITE_SPACES:
-                self._get_left_white_spaces()
+                return self._count_file_left_white_spaces
             case _:
                 raise ValueError(f"ERROR: Mode {self.complexity_method} does not apply to complexity")
 
@@ -126,108 +248,239 @@ class Hotspots:
             case _:
                 raise ValueError(f"ERROR: Mode {self.changes_method} does not apply to changes")
 
-    def _get_number_of_lines(self) -> None:
-        self.data["complexity"] = self.data['file_path'].apply(lambda x: self._count_file_lines(x))
+    @staticmethod
+    def _count_files(counter, file_paths: Iterable[str]) -> list:
+        with ThreadPoolExecutor(max_workers=IO_WORKERS) as executor:
+            return list(executor.map(counter, file_paths))
+
+    def _get_cached_complexity(self, counter, file_paths: Iterable[str]) -> list:
+        if not self.use_cache:
+            return self._count_files(counter, file_paths)
+
+        # Only files whose mtime or size changed since they were last counted need to be read again
+        method = self.complexity_method.name
+        # Paths are stored as raw bytes, so names that aren't valid UTF-8 can be cached too. Every path under the
+        # analyzed folder sorts between its prefix and the prefix with the separator bumped
+        analyze_prefix = os.fsencode(self.analyze_path.rstrip(os.sep) + os.sep)
+        prefix_range = (analyze_prefix, analyze_prefix[:-1] + bytes([analyze_prefix[-1] + 1]))
+        try:
+            with self._open_cache() as cache:
+                rows = cache.execute("SELECT path, mtime, size, complexity FROM files "
+                                     "WHERE method = ? AND path >= ? AND path < ?", (method, *prefix_range))
+                cached = {os.fsdecode(path): (mtime, size, complexity) for path, mtime, size, complexity in rows}
+        except CACHE_ERRORS:
+            return self._count_files(counter, file_paths)
+
+        seen, stale = [], []
+
+        def stale_file_paths() -> Iterator[str]:
+            for file_path in file_paths:
+                seen.append(file_path)
+                stat = os.stat(file_path)
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if cached.get(file_path, (None, None))[:2] != signature:
+                    stale.append((file_path, *signature))
+                    yield file_path
+
+        counts = self._count_files(counter, stale_file_paths())
+        for (file_path, mtime, size), count in zip(stale, counts):
+            cached[file_path] = (mtime, size, count)
+
+        try:
+            with self._open_cache() as cache:
+                cache.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                                  [(method, os.fsencode(file_path), mtime, size, count)
+                                   for (file_path, mtime, size), count in zip(stale, counts)])
+                # Drop files that were deleted, renamed or excluded since they were cached
+                removed = [(os.fsencode(file_path),) for file_path in cached.keys() - set(seen)]
+                cache.executemany("DELETE FROM files WHERE path = ?", removed)
+        except CACHE_ERRORS:
+            pass  # The counts are still valid, they just won't be reused by the next run
+
+        return [cached[file_path][2] for file_path in seen]
 
     @staticmethod
     def _count_file_lines(file_path) -> int:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-            return len(file.readlines())
+        # Counts line breaks as universal newlines do: '\n', '\r\n' and a lone '\r' each end a line
+        with open(file_path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size > MMAP_MIN_SIZE:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    content = np.frombuffer(buffer, dtype=np.uint8)
+                    lines = 0
+                    after_carriage_return = False
+                    # Scan in windows so the comparison temporaries stay READ_CHUNK_SIZE long whatever the file size
+                    for start in range(0, len(content), READ_CHUNK_SIZE):
+                        window = content[start:start + READ_CHUNK_SIZE]
+                        line_feeds = window == 0x0A
+                        carriage_returns = window == 0x0D
+                        lines += int(np.count_nonzero(line_feeds) + np.count_nonzero(carriage_returns)
+                                     - np.count_nonzero(carriage_returns[:-1] & line_feeds[1:]))
+                        if after_carriage_return and line_feeds[0]:
+                            lines -= 1  # '\r\n' split across windows
+                        after_carriage_return = bool(carriage_returns[-1])
+                    ends_with_newline = content[-1] == 0x0A or content[-1] == 0x0D
+                    del content, window  # The mmap can't be closed while numpy views exist
+            else:
+                content = file.read()
+                lines = content.count(b'\n') + content.count(b'\r') - content.count(b'\r\n')
+                ends_with_newline = not content or content.endswith((b'\n', b'\r'))
 
-    def _get_left_white_spaces(self) -> None:
-        self.data["complexity"] = self.data['file_path'].apply(lambda x: self._count_file_left_white_spaces(x))
+        if not ends_with_newline:
+            lines += 1  # Last line has no trailing newline
+        return lines
 
     @staticmethod
     def _count_file_left_white_spaces(file_path: str) -> int:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-            total_white_spaces = 0
-            for line in file:
-                stripped_line = line.lstrip()
-                if stripped_line and not stripped_line.startswith(('#', '//', '/*', '*')):
-                    total_white_spaces += len(line) - len(stripped_line)
+        with open(file_path, 'rb') as file:
+            if njit is None:
+                content = file.read()
+            elif os.fstat(file.fileno()).st_size > MMAP_MIN_SIZE:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    content = np.frombuffer(buffer, dtype=np.uint8)
+                    total_white_spaces = int(_count_left_white_spaces_kernel(content))
+                    del content  # The mmap can't be closed while the numpy view exists
+                return total_white_spaces
+            else:
+                return int(_count_left_white_spaces_kernel(np.frombuffer(file.read(), dtype=np.uint8)))
+
+        total_white_spaces = 0
+        for line in content.splitlines():
+            stripped_line = line.lstrip()
+            if stripped_line and not stripped_line.startswith((b'#', b'//', b'/*', b'*')):
+                total_white_spaces += len(line) - len(stripped_line)
         return total_white_spaces
 
     def _get_number_of_commits(self) -> None:
-        command = self._get_number_of_commits_command()
-        output = self._run_command(command)
-        files = output.split('\n')
-        counts = collections.Counter(files)
-        del counts['']  # Remove empty string key which comes from extra newlines
+        counts = self._get_cached_changes(self._count_number_of_commits)
 
         # Map the commit counts to the 'changes' column in the data DataFrame
-        self.data['changes'] = self.data['file_path'].apply(lambda x: counts[os.path.relpath(x, start=self.repo_path)])
+        self.data['changes'] = self.data['rel_path'].map(counts).fillna(0).astype('int64')
+
+    def _count_number_of_commits(self, revision_range: str | None = None) -> dict:
+        command = self._get_number_of_commits_command(revision_range)
+        counts = collections.Counter(self._run_command(command, separator=b'\0'))
+        return {os.fsdecode(file_path): count for file_path, count in counts.items()}
 
-    def _get_number_of_commits_command(self) -> list:
+    def _get_number_of_commits_command(self, revision_range: str | None = None) -> list:
         command = [
             'git', '-C', self.repo_path,
             'log',
-            '--pretty=format:', '--name-only', '--', '.'
+            '--pretty=format:', '--name-only', '--no-renames', '-z', '--', self._get_pathspec()
         ]
 
-        if self.months_back != -1:
-            since_date = (datetime.now() - timedelta(days=30 * self.months_back)).strftime('%Y-%m-%d')
-            command.insert(4, f'--since={since_date}')
+        if self._since_arg:
+            command.insert(4, self._since_arg)
 
-        return command
+        if revision_range is not None:
+            command.insert(-2, revision_range)
 
-    def _get_total_lines_changed(self) -> None:
-        self.data["changes"] = self.data['file_path'].apply(lambda x: self._count_file_total_lines_changed(x))
+        return command
 
-    def _count_file_total_lines_changed(self, file_path: str) -> int:
-        rel_path = os.path.relpath(file_path, start=self.repo_path)
-        command = self._get_lines_changed_command(rel_path)
-        output = self._run_command(command)
-        changes = [line.split('\t')[:2] for line in output.split('\n') if line]
-        total_changes = sum(int(additions) + int(deletions) for additions, deletions in changes)
-        return total_changes
+    def _get_pathspec(self) -> str:
+        # Limit history to the analyzed folder so git skips diffs for the rest of the repo. The folder is matched
+        # literally, otherwise git would expand glob characters or read a leading ':' as pathspec magic
+        return ":(literal)" + os.path.relpath(self.analyze_path, start=self.repo_path)
 
-    def _get_lines_changed_command(self, rel_path: str) -> list:
+    def _get_total_lines_changed(self) -> None:
+        totals = self._get_cached_changes(self._count_total_lines_changed)
+        self.data["changes"] = self.data['rel_path'].map(totals).fillna(0).astype('int64')
+
+    def _count_total_lines_changed(self, revision_range: str | None = None) -> dict:
+        command = self._get_total_lines_changed_command(revision_range)
+        totals = collections.defaultdict(int)
+        for record in self._run_command(command, separator=b'\0'):
+            additions, deletions, file_path = record.split(b'\t', 2)
+            if additions == b'-':  # Binary files have no line counts
+                continue
+            totals[file_path] += int(additions) + int(deletions)
+        return {os.fsdecode(file_path): total for file_path, total in totals.items()}
+
+    def _get_total_lines_changed_command(self, revision_range: str | None = None) -> list:
         command = [
             'git', '-C', self.repo_path,
             'log',
-            '--numstat',
-            '--pretty=format:',
-            '--', rel_path
+            '--numstat', '--no-renames', '-z',
+            '--pretty=format:', '--', self._get_pathspec()
         ]
 
-        if self.months_back != -1:
-            since_date = (datetime.now() - timedelta(days=30 * self.months_back)).strftime('%Y-%m-%d')
-            command.insert(4, f'--since={since_date}')
+        if self._since_arg:
+            command.insert(4, self._since_arg)
+
+        if revision_range is not None:
+            command.insert(-2, revision_range)
 
         return command
 
-    @staticmethod
-    def _run_command(command: list) -> str:
+    def _get_cached_changes(self, counter) -> dict:
+        if not self.use_cache:
+            return counter()
+
+        head = b"".join(self._run_command(['git', '-C', self.repo_path, 'rev-parse', 'HEAD'])).decode()
+        # git resolves the relative --since window against today, so windowed counts are only reused that same day
+        window_day = date.today().isoformat() if self._since_arg else None
+        key = json.dumps([self.changes_method.name, self._get_pathspec(), self.months_back, window_day])
+        counts = None
+        try:
+            with self._open_cache() as cache:
+                cached = cache.execute("SELECT head, counts FROM changes WHERE key = ?", (key,)).fetchone()
+                if cached is not None and cached[0] == head:
+                    return json.loads(cached[1])
+
+                if cached is not None and self.months_back == -1 and self._is_ancestor(cached[0], head):
+                    # Without a time window the counts are additive, so only the new commits need to be read
+                    counts = collections.Counter(json.loads(cached[1]))
+                    counts.update(counter(f"{cached[0]}..{head}"))
+                else:
+                    counts = counter()
+
+                cache.execute("INSERT OR REPLACE INTO changes VALUES (?, ?, ?)", (key, head, json.dumps(counts)))
+        except CACHE_ERRORS:
+            if counts is None:  # Failed before counting, so count without the cache
+                counts = counter()
+        return counts
+
+    def _is_ancestor(self, commit: str, descendant: str) -> bool:
+        command = ['git', '-C', self.repo_path, 'merge-base', '--is-ancestor', commit, descendant]
+        return subprocess.run(command, stderr=subprocess.DEVNULL).returncode == 0
+
+    @contextmanager
+    def _open_cache(self) -> Iterator[sqlite3.Connection]:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        repo_hash = hashlib.sha1(os.fsencode(self.repo_path)).hexdigest()
+        connection = sqlite3.connect(CACHE_DIR / f"{repo_hash}.db")
         try:
-            return subprocess.check_output(command).decode('utf-8').strip()
-        except subprocess.CalledProcessError as e:
+            if connection.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+                connection.executescript(CACHE_RESET)
+            connection.executescript(CACHE_SCHEMA)
+            with connection:  # Commits on success, rolls back on error
+                yield connection
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _run_command(command: list, separator: bytes = b'\n') -> Iterator[bytes]:
+        # Stream non-empty output records so large histories are never held in memory at once
+        with subprocess.Popen(command, stdout=subprocess.PIPE) as process:
+            remainder = b''
+            while chunk := process.stdout.read1(READ_CHUNK_SIZE):
+                records = (remainder + chunk).split(separator)
+                remainder = records.pop()
+                yield from filter(None, records)
+            if remainder:
+                yield remainder
+        if process.returncode != 0:
+            e = subprocess.CalledProcessError(process.returncode, command)
             raise RuntimeError(f"Command failed with error: {e}")
 
-    def get_color(self) -> None:
-        def color_for_file(file_path: str) -> str:
-            file_path_str = str(file_path)
-            if file_path_str.endswith('.yaml'):
-                return 'red'
-            elif file_path_str.endswith('.py'):
-                return 'blue'
-            elif file_path_str.endswith('/'):
-                return 'lime'
-            else:
-                return 'grey'
-
-        def legend_label(file_path: str) -> str:
-            file_path_str = str(file_path)
-            if file_path_str.endswith('.yaml'):
-                return '.yaml'
-            elif file_path_str.endswith('.py'):
-                return '.py'
-            elif file_path_str.endswith('/'):
-                return 'dir'
-            else:
-                return 'other'
+    def _get_legend(self) -> np.ndarray:
+        file_paths = self.data['file_path']
+        conditions = [
+            file_paths.str.endswith('.yaml'),
+            file_paths.str.endswith('.py'),
+            file_paths.str.endswith('/')
+        ]
 
-        self.data['color'] = self.data['file_path'].apply(color_for_file)
-        self.data['legend'] = self.data['file_path'].apply(legend_label)
+        return np.select(conditions, ['.yaml', '.py', 'dir'], default='other')
 
     def plot_data(self) -> None:
         if "changes" not in self.data.columns:
@@ -237,14 +490,19 @@ class Hotspots:
 
         self.data = self.wrangle_data_by_depth_level()
 
-        self.get_color()
-        self.data['file'] = self.data['file_path'].apply(lambda x: str(Path(x).relative_to(self.repo_path)))
+        # Label points by their path relative to the repo, without the trailing slash of directories, as
+        # Path.relative_to does, so the repo root itself shows up as '.'
+        labels = self.data['file_path'].str.removeprefix(self._repo_prefix).str.rstrip("/")
+        self.data = self.data.assign(
+            legend=self._get_legend(),
+            file=labels.mask(labels == "", ".")
+        )
         fig = px.scatter(
             self.data,
             x='changes',
             y='complexity',
             hover_name='file',
-            color='legend',  # Use the legend_label column for color
+            color='legend',  # Colors come from color_discrete_map
             hover_data={'complexity': False, 'changes': False, 'legend': False},
             title='Complexity vs Changes',
             labels={
@@ -267,5 +525,5 @@ if __name__ == "__main__":
                         complexity_method=ComplexityMode.LEFT_WHITE_SPACES,
                         changes_method=ChangesMode.TOTAL_LINES_CHANGED,
                         depth_level=1)
-    hotspots.get_files()
+    hotspots.scan()
     hotspots.plot_data()